@@ -1,13 +1,187 @@
 from __future__ import annotations
 from PIL import Image
 from PIL.ImageDraw import Draw
-from PIL.ImageFont import truetype
+from PIL.ImageFont import truetype, FreeTypeFont
 from PIL.Image import new, BICUBIC
-from typing import Union, Sequence, Iterable, Optional, Tuple
+from typing import Union, Sequence, Iterable, Optional, Tuple, Callable, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
 import requests
 
+# Shared session so that repeated downloads reuse pooled connections
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = f"pyme {requests.utils.default_user_agent()}"
+
+# Timeout in seconds for downloading images in PymeImage.from_url
+REQUEST_TIMEOUT = 10
+
+# Font and stroke width that PymeImage.draw_text renders captions with
+TEXT_FONT = "Impact"
+TEXT_FONT_SIZE = 50
+TEXT_STROKE_WIDTH = 4
+
+# Maximum amount of pixels an image may have to be opened by PymeImage.from_url and PymeImage.open
+MAX_PIXELS = 50_000_000
+
+# Reducing gap that is used automatically when an image is shrunk by at least this factor
+DEFAULT_REDUCING_GAP = 3.0
+
+
+@lru_cache(maxsize=32)
+def _get_font(name: str, size: int) -> FreeTypeFont:
+    """
+    Loads a TrueType font once and reuses it on later calls with the same name and size.
+
+    :param name: The name or path of the font file.
+    :param size: The requested font size in points.
+    :return: The cached Pillow FreeTypeFont instance.
+    """
+    return truetype(name, size)
+
+
+def _check_pixels(image: Image.Image, owns_fp: bool = False) -> Image.Image:
+    """
+    Rejects images with more than MAX_PIXELS pixels before their data is decoded.
+    A rejected image is closed only if its file wasn't passed in by the caller.
+
+    :param image: A lazily opened Pillow image.
+    :param owns_fp: Whether the file object the image was opened from was created internally.
+    :return: The same image, to be used for chaining
+    :exception ValueError: If the image has too many pixels.
+    """
+    pixels = image.width * image.height
+    if pixels > MAX_PIXELS:
+        if owns_fp or getattr(image, "_exclusive_fp", False):
+            image.close()
+        raise ValueError(f"Image has {pixels} pixels which exceeds the limit of {MAX_PIXELS}")
+    return image
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    """
+    Determines whether an image carries an alpha band that has to be used as a paste mask.
+
+    :param image: The Pillow image to check.
+    :return: True if the image has an alpha band, False otherwise.
+    """
+    return "A" in image.getbands()
+
+
+def _choose_reducing_gap(source_size: Sequence[int], target_size: Sequence[int],
+                         reducing_gap: Optional[float]) -> Optional[float]:
+    """
+    Picks DEFAULT_REDUCING_GAP for large downscales if no reducing gap was requested explicitly.
+
+    :param source_size: The width and height of the area that is being resized.
+    :param target_size: The width and height that the area is resized to.
+    :param reducing_gap: The reducing gap requested by the caller.
+    :return: The reducing gap that should be passed to Pillow.
+    """
+    if reducing_gap is not None or target_size[0] <= 0 or target_size[1] <= 0:
+        return reducing_gap
+    if max(source_size[0] / target_size[0], source_size[1] / target_size[1]) >= DEFAULT_REDUCING_GAP:
+        return DEFAULT_REDUCING_GAP
+    return None
+
+
+def _coerce_bbox(bbox: Sequence[Union[int, float]], width: int, height: int) -> Tuple[int, int, int, int]:
+    """
+    Converts a bounding box into absolute pixel values, the type of its first value decides how it is read.
+
+    :param bbox: A bounding box of either percentages via floats or pixels via ints.
+    :param width: The width that percentages refer to.
+    :param height: The height that percentages refer to.
+    :return: The box in pixels as (left, top, right, bottom)
+    """
+    x0, y0, x1, y1 = bbox
+    if isinstance(x0, float):
+        return int(x0 * width), int(y0 * height), int(x1 * width), int(y1 * height)
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def _keep_ratio_size(width: int, height: int, size: Sequence[int]) -> Tuple[int, int]:
+    """
+    Determines the largest size with the ratio of width and height that is equal or smaller than the given size.
+
+    :return: The new width and height
+    """
+    quotient = min(size[0] / width, size[1] / height)
+    return int(width * quotient), int(height * quotient)
+
+
+def _resize_keep_ratio(image: Image.Image, size: Tuple[int, int], resample: int = BICUBIC, box: Optional = None,
+                       reducing_gap: Optional = None) -> Image.Image:
+    """
+    Resizes a Pillow image so that both sides are equal or smaller than the given ones while keeping its ratio.
+    For a description of the parameters check PymeImage.resize
+
+    :return: The resized Pillow image
+    """
+    source_size = (box[2] - box[0], box[3] - box[1]) if box is not None else image.size
+    new_size = _keep_ratio_size(image.width, image.height, size)
+    gap = _choose_reducing_gap(source_size, new_size, reducing_gap)
+    return image.resize(new_size, resample, box, gap)
+
+
+# Shared ImageDraw used only to measure text, it is never drawn on
+_MEASURE_DRAW = Draw(new("RGBA", (1, 1)))
+
+
+def _draw_caption(draw: Draw, xy: Tuple[int, int], text: str, font: FreeTypeFont, stroke_width: int) -> None:
+    """
+    Draws text in the meme style, white with a black stroke.
+
+    :param draw: The ImageDraw to draw with.
+    :param xy: The anchor of the text, the text's measured bbox origin has to be subtracted by the caller.
+    :param text: The text to be drawn.
+    :param font: The font to draw the text in.
+    :param stroke_width: The width of the stroke around the text.
+    """
+    draw.multiline_text(xy, text, (255, 255, 255, 255), font, stroke_width=stroke_width, stroke_fill=(0, 0, 0, 255))
+
+
+@lru_cache(maxsize=256)
+def _measure_text(text: str, font_name: str, font_size: int, stroke_width: int) -> Tuple[int, int, int, int]:
+    """
+    Measures the box that text covers when drawn at (0, 0), repeated captions are served from a cache.
+
+    :param text: The text to be measured.
+    :param font_name: The name or path of the font file.
+    :param font_size: The requested font size in points.
+    :param stroke_width: The width of the stroke around the text.
+    :return: The left and top offset of the text followed by its width and height
+    """
+    text_bbox = _MEASURE_DRAW.multiline_textbbox((0., 0.), text, _get_font(font_name, font_size),
+                                                 stroke_width=stroke_width)
+    left, top = int(text_bbox[0]), int(text_bbox[1])
+    return left, top, int(text_bbox[2]) - left, int(text_bbox[3]) - top
+
+
+@lru_cache(maxsize=256)
+def _render_text_layer(text: str, font_name: str, font_size: int, stroke_width: int) -> Tuple[bytes, Tuple[int, int]]:
+    """
+    Renders white text with a black stroke onto a transparent RGBA layer, repeated captions are served from a cache.
+    The layer is cached as raw bytes so that callers can't modify the cached result.
+
+    :param text: The text to be rendered.
+    :param font_name: The name or path of the font file.
+    :param font_size: The requested font size in points.
+    :param stroke_width: The width of the stroke around the text.
+    :return: The raw RGBA bytes of the layer and its size
+    """
+    left, top, text_width, text_height = _measure_text(text, font_name, font_size, stroke_width)
+    size = (text_width, text_height)
+
+    # Draw text onto a transparent layer of the measured size
+    layer = new("RGBA", size, (0, 0, 0, 0))
+    _draw_caption(Draw(layer), (-left, -top), text, _get_font(font_name, font_size), stroke_width)
+    return layer.tobytes(), size
+
 
 class PymeImage(object):
+    __slots__ = ("_image",)
+
     def __init__(self, image: Image.Image):
         """
         A wrapper around a Pillow Image instance equipped with abstract methods to make the creation of memes easier.
@@ -17,8 +191,9 @@ class PymeImage(object):
         self._image = image
 
     def __getattr__(self, item):
-        if item == "_img":
-            raise AttributeError()
+        # Only reached for attributes without an explicit forward, guard against recursion before _image is set
+        if item == "_image":
+            raise AttributeError(item)
         return getattr(self._image, item)
 
     @property
@@ -30,40 +205,83 @@ class PymeImage(object):
         """
         return self._image
 
-    def _center_image(self, bbox: Sequence[int]) -> Tuple[int, int, int, int]:
+    @property
+    def width(self) -> int:
         """
-        Determines a bounding box inside the given bounding box that would center the given image in that area
-        :param bbox: The box inside which to place the image
-        :return: A box that is inside the given box but centered
+        The width of the wrapped image.
+
+        :return: Width in pixels
+        """
+        return self._image.width
+
+    @property
+    def height(self) -> int:
         """
-        width_bbox = bbox[2] - bbox[0]
-        height_bbox = bbox[3] - bbox[1]
+        The height of the wrapped image.
 
-        width_img = self._image.width
-        height_img = self._image.height
+        :return: Height in pixels
+        """
+        return self._image.height
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """
+        The size of the wrapped image.
+
+        :return: A 2-tuple of width and height in pixels
+        """
+        return self._image.size
+
+    @property
+    def mode(self) -> str:
+        """
+        The mode of the wrapped image.
+
+        :return: Pillow's mode string, e.g. "RGBA"
+        """
+        return self._image.mode
+
+    def ensure_rgba(self) -> PymeImage:
+        """
+        Converts the wrapped image to RGBA if it is in any other mode.
+        Useful before drawing many RGBA images onto it, as those are then composited in place without conversions.
+        Keep in mind that RGBA images can't be saved in formats like JPEG without converting them back.
+
+        :return: An instance of the PymeImage wrapper to be used for chaining
+        """
+        if self._image.mode != "RGBA":
+            self._image = self._image.convert("RGBA")
+        return self
 
-        return (
-            bbox[0] + (width_bbox - width_img) // 2,
-            bbox[1] + (height_bbox - height_img) // 2,
-            bbox[0] + (width_bbox + width_img) // 2,
-            bbox[1] + (height_bbox + height_img) // 2
-        )
+    @staticmethod
+    def _center_image(bbox: Sequence[int], width_img: int, height_img: int) -> Tuple[int, int, int, int]:
+        """
+        Determines a bounding box inside the given bounding box that would center an image of the given size in that area
+        :param bbox: The box inside which to place the image
+        :param width_img: The width of the image to be centered
+        :param height_img: The height of the image to be centered
+        :return: A box that is inside the given box but centered
+        """
+        x0, y0, x1, y1 = bbox
+        dx = (x1 - x0 - width_img) // 2
+        dy = (y1 - y0 - height_img) // 2
+        return x0 + dx, y0 + dy, x0 + dx + width_img, y0 + dy + height_img
 
     def add_padding(self, left: int = 0, top: int = 0, right: int = 0, bottom: int = 0) -> None:
         """
-        Adds padding to the Pyme wrapped image
+        Adds padding to the Pyme wrapped image.
+        All values are the amount of pixels added on that side, negative values are ignored.
 
         :param left: Padding on the left side
         :param top: Padding on the top
         :param right: Padding on the right side
         :param bottom: Padding on the bottom
         """
-        # Skip if all values are 0
-        if not any([left, top, right, bottom]):
+        # Skip if no side gets any padding
+        if left <= 0 and top <= 0 and right <= 0 and bottom <= 0:
             return
 
-        result = self._image.copy()
-        new_size = [result.width, result.height]
+        new_size = [self._image.width, self._image.height]
         paste_coords = [0, 0]
 
         if left > 0:
@@ -72,13 +290,16 @@ class PymeImage(object):
         if top > 0:
             paste_coords[1] = top
             new_size[1] += top
-        if right > result.width:
-            new_size[0] += right - result.width
-        if bottom > result.height:
-            new_size[1] += bottom - result.height
-        
+        if right > 0:
+            new_size[0] += right
+        if bottom > 0:
+            new_size[1] += bottom
+
         background = Image.new("RGBA", new_size, (255, 255, 255, 255))
-        background.paste(result, paste_coords, result)
+        if _has_alpha(self._image):
+            background.paste(self._image, paste_coords, self._image)
+        else:
+            background.paste(self._image, paste_coords)
         self._image = background
 
     def draw_image(self, image: Union[Image.Image, PymeImage], bbox: Sequence[Union[int, float]]) -> None:
@@ -95,21 +316,19 @@ class PymeImage(object):
             raise ValueError("Bounding box requires 4 arguments")
 
         # Get values needed for later
-        width = self.width
-        height = self.height
+        width, height = self._image.size
 
         # If bbox is an array of percentages, calculate the absolute values
-        if isinstance(bbox[0], float):
-            bbox = (
-                int(bbox[0] * width),
-                int(bbox[1] * height),
-                int(bbox[2] * width),
-                int(bbox[3] * height)
-            )
-
-        # Adding padding if any is needed
-        if bbox[0] < 0 or bbox[1] < 0 or bbox[2] > width or bbox[3] > height:
-            self.add_padding(abs(bbox[0]), abs(bbox[1]), bbox[2], bbox[3])
+        bbox = _coerce_bbox(bbox, width, height)
+
+        # Adding padding if any is needed and moving the bbox along with the padded image
+        pad_left = max(0, -bbox[0])
+        pad_top = max(0, -bbox[1])
+        pad_right = max(0, bbox[2] - width)
+        pad_bottom = max(0, bbox[3] - height)
+        if pad_left or pad_top or pad_right or pad_bottom:
+            self.add_padding(pad_left, pad_top, pad_right, pad_bottom)
+            bbox = (bbox[0] + pad_left, bbox[1] + pad_top, bbox[2] + pad_left, bbox[3] + pad_top)
 
         # Check whether the image is wrapped in PymeImage
         if isinstance(image, PymeImage):
@@ -117,19 +336,16 @@ class PymeImage(object):
 
         # Adjust size of the image to be drawn
         new_size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
-        image = PymeImage(image).resize(new_size, keep_ratio=True).image
+        image = _resize_keep_ratio(image, new_size)
 
         # Paste the image
-        paste_coords = [
-            bbox[0] if bbox[0] > 0 else 0,
-            bbox[1] if bbox[1] > 0 else 0,
-            bbox[2],
-            bbox[3]
-        ]
-        paste_coords = PymeImage(image)._center_image(paste_coords)
-        try:
+        paste_coords = PymeImage._center_image(bbox, image.width, image.height)
+        if image.mode == "RGBA" and self._image.mode == "RGBA":
+            # Composites only the covered region in place, which avoids a separate mask pass
+            self._image.alpha_composite(image, tuple(paste_coords[:2]))
+        elif _has_alpha(image):
             self._image.paste(image, paste_coords[:2], image)
-        except ValueError:
+        else:
             self._image.paste(image, paste_coords[:2])
 
     def draw_text(self, text: str, bbox: Sequence[Union[int, float]]) -> None:
@@ -145,19 +361,26 @@ class PymeImage(object):
         if len(bbox) != 4:
             raise ValueError("Bounding box requires 4 arguments")
 
-        # Get the impact font
-        impact_font = truetype("Impact", 50)
-
-        # Measure the area that the text should be drawn on with a dummy ImageDraw
-        size = Draw(new("RGBA", (1, 1))).multiline_textbbox((0., 0.), text, impact_font, stroke_width=4)
-        size = [int(i) for i in size[2:]]
-
-        # Create the area that the text should be drawn on
-        text_background = new("RGBA", size, (0, 0, 0, 0))
+        # Measure the area that the text should be drawn on, repeated captions come from the cache
+        left, top, text_width, text_height = _measure_text(text, TEXT_FONT, TEXT_FONT_SIZE, TEXT_STROKE_WIDTH)
+        size = (text_width, text_height)
+
+        # Draw straight onto the wrapped image if the text neither needs scaling nor padding,
+        # other modes like L or 1 can't take the RGBA caption colors and go through the layer instead
+        width, height = self._image.size
+        bbox = _coerce_bbox(bbox, width, height)
+        bbox_size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        direct = self._image.mode in ("RGB", "RGBA")
+        direct = direct and bbox[0] >= 0 and bbox[1] >= 0 and bbox[2] <= width and bbox[3] <= height
+        if direct and _keep_ratio_size(text_width, text_height, bbox_size) == size:
+            text_coords = PymeImage._center_image(bbox, text_width, text_height)
+            _draw_caption(Draw(self._image), (text_coords[0] - left, text_coords[1] - top), text,
+                          _get_font(TEXT_FONT, TEXT_FONT_SIZE), TEXT_STROKE_WIDTH)
+            return
 
-        # Draw text onto the text_background
-        text_background_draw = Draw(text_background)
-        text_background_draw.multiline_text((0, 0), text, (255, 255, 255, 255), impact_font, stroke_width=4, stroke_fill=(0, 0, 0, 255))
+        # Get the rendered text, repeated captions come from the cache
+        layer_bytes, layer_size = _render_text_layer(text, TEXT_FONT, TEXT_FONT_SIZE, TEXT_STROKE_WIDTH)
+        text_background = Image.frombytes("RGBA", layer_size, layer_bytes)
 
         # Draw image containing text onto original image
         self.draw_image(text_background, bbox)
@@ -179,30 +402,68 @@ class PymeImage(object):
         The smaller ``reducing_gap``, the faster resizing.
         With ``reducing_gap`` greater or equal to 3.0,
         the result is indistinguishable from fair resampling in most cases.
-        The default value is None (no optimization)
+        The default value is None, in which case DEFAULT_REDUCING_GAP is used
+        when the image is shrunk by at least that factor and no optimization is applied otherwise.
         :param keep_ratio: Determines whether or not the imae should keep its original ratio.
         The image will be resized to the point that both sides are equal or smaller than the given ones.
         :return: An instance of the PymeImage wrapper to be used for chaining
         """
         if keep_ratio:
-            width = self.width
-            height = self.height
-
-            width_quotient = size[0] / width
-            height_quotient = size[1] / height
-
-            if width_quotient < height_quotient:
-                new_width = int(width * width_quotient)
-                new_height = int(height * width_quotient)
-                self._image = self._image.resize((new_width, new_height), resample, box, reducing_gap)
-            else:
-                new_width = int(width * height_quotient)
-                new_height = int(height * height_quotient)
-                self._image = self._image.resize((new_width, new_height), resample, box, reducing_gap)
+            self._image = _resize_keep_ratio(self._image, size, resample, box, reducing_gap)
         else:
-            self._image = self._image.resize(size, resample, box, reducing_gap)
+            source_size = (box[2] - box[0], box[3] - box[1]) if box is not None else self._image.size
+            gap = _choose_reducing_gap(source_size, size, reducing_gap)
+            self._image = self._image.resize(size, resample, box, gap)
         return self
 
+    def as_array(self):
+        """
+        Returns the pixels of the wrapped image as a NumPy array for vectorized pixel operations.
+        The array doesn't share memory with the image and may be read-only,
+        modified pixels have to be wrapped again with PymeImage.from_array.
+        Requires NumPy to be installed.
+
+        :return: A numpy.ndarray of shape (height, width) or (height, width, bands)
+        """
+        import numpy as np
+
+        return np.asarray(self._image)
+
+    @classmethod
+    def from_array(cls, array, mode: Optional[str] = None) -> PymeImage:
+        """
+        Returns a PymeImage that wraps around a Pillow image created from a NumPy array.
+        For more details check PIL.Image.fromarray
+
+        :param array: A numpy.ndarray, e.g. one returned by PymeImage.as_array.
+        :param mode: The mode to interpret the array in, by default it is determined from the array's shape and type.
+        :return: Resulting PymeImage Wrapper.
+        """
+        return cls(Image.fromarray(array, mode))
+
+    @classmethod
+    def batch_process(cls, operations: Iterable[Callable[[PymeImage], None]], images: Iterable[PymeImage],
+                      workers: Optional[int] = None) -> List[PymeImage]:
+        """
+        Applies the given operations in order to every image, processing the images concurrently in threads.
+        Pillow releases the GIL while resizing, pasting and compositing so this scales with the available cores.
+        The same PymeImage instance must not be passed more than once or be used by other threads meanwhile.
+
+        :param operations: Callables that each take a PymeImage and modify it, e.g. lambda img: img.draw_text(...).
+        :param images: The PymeImage instances to be processed.
+        :param workers: The maximum amount of threads, defaults to the one of ThreadPoolExecutor.
+        :return: The processed PymeImage instances in the order they were given.
+        """
+        operations = tuple(operations)
+
+        def process(image: PymeImage) -> PymeImage:
+            for operation in operations:
+                operation(image)
+            return image
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(process, images))
+
     @classmethod
     def from_url(cls, url: str) -> PymeImage:
         """
@@ -210,8 +471,15 @@ class PymeImage(object):
 
         :param url: Url to pull from.
         :return: Resulting PymeImage Wrapper.
+        :exception requests.HTTPError: If the server responds with an error status code.
+        :exception ValueError: If the image has more than MAX_PIXELS pixels.
         """
-        img: Image.Image = Image.open(requests.get(url, stream=True).raw)
+        response = _SESSION.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+
+        # Decode from the complete in-memory payload instead of many small reads on the socket
+        img: Image.Image = _check_pixels(Image.open(BytesIO(response.content)), owns_fp=True)
+        img.load()
         return cls(img)
 
     @classmethod
@@ -224,6 +492,7 @@ class PymeImage(object):
         :param mode: The mode, if given this argument must be "r".
         :param formats: An Iterable of formats to try and interpret the file in.
         :return: An instance of PymeImage that wraps a Pillow Image.
+        :exception ValueError: If the image has more than MAX_PIXELS pixels.
         """
-        return cls(Image.open(fp, mode, formats))
+        return cls(_check_pixels(Image.open(fp, mode, formats)))
 